@@ -1,65 +1,276 @@
 import getpass
-import paramiko
+import sys
 import logging
+import os
+import json
+import atexit
 import time
 import re
+import string
+import select
+import socket
 from datetime import datetime, timedelta
-import pytz
-import sched
-import difflib
-from collections import defaultdict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import uuid
+import threading
+import tempfile
+import shutil
+from collections import defaultdict, deque
+from types import MappingProxyType
+from typing import Optional
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class DeviceCommands:
-    """Class to handle vendor-specific commands"""
-    
-    @staticmethod
-    def get_pagination_command(device_type):
-        commands = {
-            'juniper': 'set cli screen-length 0',
-            'cisco-ios': 'terminal length 0',
-            'cisco-nxos': 'terminal length 0',
-            'arista': 'terminal length 0',
-            'default': 'terminal length 0'
-        }
-        return commands.get(device_type, commands['default'])
-    
-    @staticmethod
-    def get_config_mode_command(device_type):
-        commands = {
-            'juniper': 'configure',
-            'cisco-ios': 'configure terminal',
-            'cisco-nxos': 'configure terminal',
-            'arista': 'configure terminal',
-            'default': 'configure terminal'
-        }
-        return commands.get(device_type, commands['default'])
-    
-    @staticmethod
-    def get_commit_command(device_type):
-        commands = {
-            'juniper': 'commit and-quit',
-            'cisco-ios': 'end',
-            'cisco-nxos': 'end',
-            'arista': 'end',
-            'default': 'end'
-        }
-        return commands.get(device_type, commands['default'])
+# Timezone used for scheduled pushes, resolved only when a push is scheduled since
+# hosts without a tz database (Windows without tzdata) cannot load it
+EASTERN_TZ = 'America/New_York'
+
+# Upper bound on hosts handled at the same time
+MAX_CONCURRENT_HOSTS = 20
+
+# Parallel exec channels per host, kept below sshd's default MaxSessions of 10
+MAX_CHANNELS_PER_HOST = 8
+
+# Device families known to accept several concurrent exec channels
+PARALLEL_EXEC_VENDORS = frozenset({'cisco', 'arista', 'juniper'})
+
+# First words that mark a command set as configuration rather than read-only
+CONFIG_KEYWORDS = frozenset({'set', 'conf', 'config', 'configure', 'commit', 'delete', 'edit'})
+
+# Keeps each host's output block in one piece on stdout
+_output_lock = threading.Lock()
+
+# Default name for saved check output
+CHECK_FILE_TEMPLATE = '{host}_{check}_{ts}.txt'
+
+# Piped stdin, split into lines on first use
+_stdin_lines = None
+
+# Trailing CLI prompt such as "router#", "user@host>" or "switch(config)#"
+PROMPT_RE = re.compile(rb'[\r\n][^\r\n]*[#>$]\s*$')
+
+# Algorithms tried ahead of Paramiko's defaults: AEAD ciphers and SHA-2 MACs that
+# cryptography runs on AES-NI/SHA-NI, and curve25519 key exchange. Unsupported
+# names are skipped.
+PREFERRED_CIPHERS = ('aes128-gcm@openssh.com', 'aes256-gcm@openssh.com', 'chacha20-poly1305@openssh.com', 'aes128-ctr')
+PREFERRED_MACS = ('hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256')
+PREFERRED_KEX = ('curve25519-sha256', 'curve25519-sha256@libssh.org')
+
+# Channel window, twice Paramiko's 2 MB default, so fewer window adjusts cap
+# throughput on large show outputs over high-latency links
+SSH_WINDOW_SIZE = 4 * 1024 * 1024
+
+# Output of one parallel exec channel kept in memory before it spills to a temp file
+SPOOL_MAX_BYTES = 1024 * 1024
+
+# Host keys accepted by this tool, kept apart from the user's own known_hosts
+KNOWN_HOSTS_PATH = os.path.expanduser('~/.ssh/known_hosts_network_tool')
+
+# Persisted device types, keyed by hostname, so repeat runs skip detection
+DEVICE_CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                 'network-tool', 'devices.json')
+DEVICE_CACHE_TTL = 86400
+
+# Vendor-specific commands, keyed by the vendor part of the device type ("juniper-mx" -> "juniper")
+_PAGINATION = MappingProxyType({
+    'juniper': 'set cli screen-length 0',
+    'cisco': 'terminal length 0',
+    'arista': 'terminal length 0',
+    'default': 'terminal length 0'
+})
+_CONFIG_MODE = MappingProxyType({
+    'juniper': 'configure',
+    'cisco': 'configure terminal',
+    'arista': 'configure terminal',
+    'default': 'configure terminal'
+})
+_COMMIT = MappingProxyType({
+    'juniper': 'commit and-quit',
+    'cisco': 'end',
+    'arista': 'end',
+    'default': 'end'
+})
+_COMMENT = MappingProxyType({
+    'juniper': '#',
+    'cisco': '!',
+    'arista': '!',
+    'default': '!'
+})
+
+# Timestamps (with optional fractional seconds) masked out before diffing outputs
+_RX_TIMESTAMP = re.compile(r'\d{2}:\d{2}:\d{2}(?:\.\d+)?')
+
+# Device detection patterns, matched in a single pass over show version output
+_RX_JUNIPER_MODEL = re.compile(r'^Model:\s*(?:\S*?(?P<family>(?i:mx|ex|srx|qfx)))?', re.MULTILINE)
+_DEVICE_RX = re.compile(
+    r'(?P<asr>ASR\d+)|(?P<isr>ISR\d+)|(?P<csr>CSR\d+)'
+    r'|(?P<cat>\bC\d{3,4})'  # Catalyst models incl. C3750E / WS-C2960X-48; ASR/ISR/CSR are ranked first
+    r'|(?P<nexus_family>N[1-9]K)|(?P<dcs>DCS-\d+)'
+    r'|(?P<ios>(?i:cisco ios|ios software))|(?P<nxos>(?i:nx-os|nexus))|(?P<arista>(?i:arista))'
+)
+# (vendor group, (model group, device type) pairs in priority order, vendor fallback)
+_DEVICE_FAMILIES = (
+    ('ios', (('asr', 'cisco-ios-asr'), ('isr', 'cisco-ios-isr'),
+             ('csr', 'cisco-ios-csr'), ('cat', 'cisco-ios-catalyst')), 'cisco-ios'),
+    ('nxos', (('nexus_family', 'cisco-nxos'),), 'cisco-nxos-unknown'),
+    ('arista', (('dcs', 'arista-dcs'),), 'arista'),
+)
+
+# Caret line plus error line a CLI prints if it rejects a comment line used as a batch
+# marker. The error only counts right under a caret, a bare "invalid" after a marker
+# is usually the next command's echo (e.g. "description invalid-circuit").
+_RX_CARET_LINE = re.compile(rb'[ \t]*\^[ \t]*')
+MARKER_REJECTION = re.compile(rb'syntax error|invalid|unknown command|unrecognized command', re.IGNORECASE)
+
+# Bytes of recent output kept for prompt detection while streaming to a sink
+STREAM_TAIL_BYTES = 8192
+
+def _prefer(preferred, defaults, supported):
+    """Put the supported preferred algorithms first, keeping the other defaults as fallback."""
+    head = tuple(name for name in preferred if name in supported)
+    return head + tuple(name for name in defaults if name not in head)
+
+def _prefer_fast_algorithms(paramiko):
+    transport = paramiko.Transport
+    transport._preferred_ciphers = _prefer(PREFERRED_CIPHERS, transport._preferred_ciphers, transport._cipher_info)
+    transport._preferred_macs = _prefer(PREFERRED_MACS, transport._preferred_macs, transport._mac_info)
+    transport._preferred_kex = _prefer(PREFERRED_KEX, transport._preferred_kex, transport._kex_info)
+
+def load_private_key(path, passphrase=None):
+    """Load an Ed25519, ECDSA or RSA private key from a file."""
+    import paramiko
+
+    for key_class in (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey):
+        try:
+            return key_class.from_private_key_file(path, password=passphrase)
+        except paramiko.PasswordRequiredException:
+            # Encrypted key and no passphrase, trying other key types would only hide that
+            raise paramiko.PasswordRequiredException(f"Private key {path} is encrypted, enter its passphrase as the password")
+        except paramiko.SSHException:
+            continue
+    raise ValueError(f"Unsupported or unreadable private key: {path}")
+
+class SSHPool:
+    """Pool of live SSH clients keyed by (hostname, username)
+
+    When pkey is given, new connections use public-key (and agent) auth
+    instead of password-only auth.
+    """
+
+    def __init__(self, maxsize=8, keepalive=30, pkey=None):
+        self.maxsize = maxsize
+        self.keepalive = keepalive
+        self.pkey = pkey
+        self._idle = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._host_keys_lock = threading.Lock()
+
+    def acquire(self, hostname, username, password):
+        """Lend out a live client, reconnecting if no idle one survives a probe."""
+        # Imported lazily, paramiko pulls in cryptography and dominates startup time
+        import paramiko
+
+        key = (hostname, username)
+        while True:
+            with self._lock:
+                idle = self._idle[key]
+                client = idle.popleft() if idle else None
+            if client is None:
+                break
+            transport = client.get_transport()
+            try:
+                if transport is not None and transport.is_active():
+                    transport.send_ignore()
+                    return client
+            except Exception:
+                pass
+            client.close()
+
+        _prefer_fast_algorithms(paramiko)
+        client = paramiko.SSHClient()
+        if os.path.exists(KNOWN_HOSTS_PATH):
+            client.load_host_keys(KNOWN_HOSTS_PATH)
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        if self.pkey is not None:
+            auth = {'pkey': self.pkey}
+        else:
+            auth = {'allow_agent': False, 'look_for_keys': False}
+        client.connect(hostname, username=username, password=password, compress=True, **auth)
+        transport = client.get_transport()
+        transport.set_keepalive(self.keepalive)
+        # Picked up by every channel opened later, both the shell and exec reads
+        transport.default_window_size = SSH_WINDOW_SIZE
+        # Interactive exchanges are small writes, don't let Nagle hold them back
+        try:
+            transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError):
+            pass  # Not a plain TCP socket, e.g. a proxy command
+        self._save_host_keys(client)
+        return client
+
+    def _save_host_keys(self, client):
+        with self._host_keys_lock:
+            try:
+                os.makedirs(os.path.dirname(KNOWN_HOSTS_PATH), mode=0o700, exist_ok=True)
+                if os.path.exists(KNOWN_HOSTS_PATH):
+                    # Merge keys other workers saved since this client loaded the file
+                    client.load_host_keys(KNOWN_HOSTS_PATH)
+                client.save_host_keys(KNOWN_HOSTS_PATH)
+            except OSError as e:
+                logging.warning("Could not save host keys: %s", e)
+
+    def release(self, hostname, username, client):
+        """Return a client to the pool, closing it if the pool is full."""
+        with self._lock:
+            idle = self._idle[(hostname, username)]
+            if len(idle) < self.maxsize:
+                idle.append(client)
+                return
+        client.close()
+
+    def close_all(self):
+        with self._lock:
+            clients = [client for idle in self._idle.values() for client in idle]
+            self._idle.clear()
+        for client in clients:
+            client.close()
+
+def read_line(prompt='', default=''):
+    """input() replacement that drains piped stdin with a single read, default at end of input."""
+    global _stdin_lines
+    if sys.stdin.isatty():
+        try:
+            return input(prompt)
+        except EOFError:
+            return default
+    if _stdin_lines is None:
+        _stdin_lines = iter(sys.stdin.read().splitlines())
+    return next(_stdin_lines, default)
+
+def write_output(text):
+    """Write a block of host output to stdout with a single write call."""
+    with _output_lock:
+        sys.stdout.write(text)
 
 def get_user_input():
-    hostnames = input("Enter hostname(s) or IP address(es) (separated by commas): ")
+    hostnames = read_line("Enter hostname(s) or IP address(es) (separated by commas): ")
     hostname_list = [h.strip() for h in hostnames.split(',')]
-    username = input("Enter username: ")
-    password = getpass.getpass(prompt='Enter password: ')
-    return hostname_list, username, password
+    username = read_line("Enter username: ")
+    if sys.stdin.isatty():
+        password = getpass.getpass(prompt='Enter password: ')
+    else:
+        password = read_line()
+    key_path = read_line("Path to SSH key (blank for password): ").strip()
+    return hostname_list, username, password, os.path.expanduser(key_path) if key_path else None
 
 def get_commands():
     print("Enter commands to execute. Press Enter once when finished:")
     commands = []
     while True:
-        command = input()
+        command = read_line()
         if command == '':
             break
         commands.append(command)
@@ -81,191 +292,495 @@ def get_all_commands():
     return config_commands, pre_check_commands, post_check_commands
 
 def get_schedule_option():
-    option = input("Do you want to schedule the config push? (yes/no): ").strip().lower()
+    option = read_line("Do you want to schedule the config push? (yes/no): ").strip().lower()
     if option in ['yes', 'y']:
-        date_str = input("Enter date and time in EST (YYYY-MM-DD HH:MM:SS): ").strip()
-        est = pytz.timezone('US/Eastern')
-        scheduled_time = est.localize(datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S"))
+        date_str = read_line("Enter date and time in EST (YYYY-MM-DD HH:MM:SS): ").strip()
+        scheduled_time = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=ZoneInfo(EASTERN_TZ))
         return scheduled_time
     return None
 
-def identify_device_type(shell):
+def _load_device_cache():
+    try:
+        with open(DEVICE_CACHE_PATH) as f:
+            return {hostname: tuple(entry) for hostname, entry in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+_device_cache = _load_device_cache()
+_device_cache_saved = dict(_device_cache)
+
+@atexit.register
+def _save_device_cache():
+    # Nothing was probed this run, so the file on disk is already current
+    if _device_cache == _device_cache_saved:
+        return
+    try:
+        os.makedirs(os.path.dirname(DEVICE_CACHE_PATH), exist_ok=True)
+        with open(DEVICE_CACHE_PATH, 'w') as f:
+            json.dump(_device_cache, f)
+    except OSError as e:
+        logging.warning("Could not save device cache: %s", e)
+
+def get_device_type(hostname, shell, prompt_re=PROMPT_RE, ttl=DEVICE_CACHE_TTL):
+    """Return the cached device type for a host, probing it on a miss."""
+    now = time.time()
+    hit = _device_cache.get(hostname)
+    if hit and now - hit[0] < ttl:
+        return hit[1]
+    device_type = identify_device_type(shell, prompt_re)
+    # Leave failed detections uncached so the next run probes again
+    if device_type != 'unknown':
+        _device_cache[hostname] = (now, device_type)
+    return device_type
+
+def _reply_body(raw):
+    """Decode a command reply without its echoed command line and trailing prompt."""
+    # The echo of a filter like "include ...|Nexus|Arista" would match every vendor pattern
+    body = raw.decode('utf-8', errors='ignore').partition('\n')[2]
+    return body.rpartition('\n')[0]
+
+def identify_device_type(shell, prompt_re=PROMPT_RE):
     """Identify the network device type and model."""
-    shell.settimeout(2)
+    # The prompt alone tells Junos (user@host>) apart from Cisco/Arista (host# or host>)
+    shell.send('\n')
+    lines = read_until_prompt(shell, prompt_re).decode('utf-8', errors='ignore').strip().splitlines()
+    last = lines[-1].strip() if lines else ''
     
-    # First try Juniper identification
-    shell.send('set cli screen-length 0\n')
-    time.sleep(1)
-    output = shell.recv(1024).decode('utf-8', errors='ignore')
-    
-    if 'syntax error' not in output.lower():
-        # It's a Juniper device
-        shell.send('show version\n')
-        time.sleep(2)
-        version_output = get_command_output(shell)
+    if '@' in last and last.endswith('>'):
+        # It's a Juniper device, only the model line is needed
+        shell.send('show version | match Model:\n')
+        version_output = _reply_body(read_until_prompt(shell, prompt_re))
         
         # Parse Juniper model
-        match = re.search(r'^Model:\s*(\S+)', version_output, re.MULTILINE)
-        if match:
-            model = match.group(1).lower()
-            if 'mx' in model:
-                return 'juniper-mx'
-            elif 'ex' in model:
-                return 'juniper-ex'
-            elif 'srx' in model:
-                return 'juniper-srx'
-            elif 'qfx' in model:
-                return 'juniper-qfx'
-            else:
-                return 'juniper-unknown'
+        match = _RX_JUNIPER_MODEL.search(version_output)
+        family = match.group('family') if match else None
+        return f"juniper-{family.lower()}" if family else 'juniper-unknown'
     
-    # Try Cisco/Arista identification
-    shell.send('terminal length 0\n')
-    time.sleep(1)
-    shell.recv(1024)  # Clear buffer
+    if not last.endswith(('#', '>')):
+        return 'unknown'
     
-    shell.send('show version\n')
-    time.sleep(2)
-    version_output = get_command_output(shell)
-    
-    # Cisco IOS/IOS-XE detection
-    if re.search(r'cisco ios|ios software', version_output, re.IGNORECASE):
-        # Detect specific Cisco models
-        if re.search(r'ASR\d+', version_output):
-            return 'cisco-ios-asr'
-        elif re.search(r'ISR\d+', version_output):
-            return 'cisco-ios-isr'
-        elif re.search(r'CSR\d+', version_output):
-            return 'cisco-ios-csr'
-        elif re.search(r'C\d+', version_output):  # Catalyst switches
-            return 'cisco-ios-catalyst'
-        else:
-            return 'cisco-ios'
-    
-    # Cisco NX-OS detection
-    elif re.search(r'nx-os|nexus', version_output, re.IGNORECASE):
-        if re.search(r'N[1-9][K]', version_output):  # Nexus series
-            return 'cisco-nxos'
-        else:
-            return 'cisco-nxos-unknown'
+    # Filtered show version keeps the reply to a few lines, so paging never kicks in
+    shell.send('show version | include Software|cisco|Cisco|Nexus|Arista|DCS-\n')
+    version_output = _reply_body(read_until_prompt(shell, prompt_re))
     
-    # Arista detection
-    elif re.search(r'arista', version_output, re.IGNORECASE):
-        if re.search(r'DCS-\d+', version_output):
-            return 'arista-dcs'
-        else:
-            return 'arista'
+    # Cisco IOS/NX-OS and Arista detection
+    found = {match.lastgroup for match in _DEVICE_RX.finditer(version_output)}
+    for vendor, models, fallback in _DEVICE_FAMILIES:
+        if vendor in found:
+            return next((device_type for group, device_type in models if group in found), fallback)
     
     return 'unknown'
 
-def get_command_output(shell, timeout=2):
-    """Get command output with timeout."""
-    output = ''
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            if shell.recv_ready():
-                recv_data = shell.recv(4096).decode('utf-8', errors='ignore')
-                if not recv_data:
-                    break
-                output += recv_data
-            else:
-                time.sleep(0.1)
-        except Exception:
+def learn_prompt(output):
+    """Build a regex for this device's own prompt from output that ends with it.
+
+    Matching "router" before the prompt character, rather than any line ending in
+    # or >, keeps output lines like "<description>" from ending a read early.
+    """
+    lines = output.rstrip().splitlines()
+    prompt = lines[-1].strip() if lines else b''
+    if not PROMPT_RE.search(b'\n' + prompt):
+        return PROMPT_RE
+    # Some platforms truncate long hostnames in config-mode prompts
+    stem = prompt.rstrip(b'#>$ ')[:16]
+    if not stem:
+        return PROMPT_RE
+    prompt_re = re.compile(rb'[\r\n]' + re.escape(stem) + rb'[^\r\n]*[#>$]\s*$')
+    # A prompt that does not end the output it came from is no prompt at all
+    return prompt_re if prompt_re.search(output) else PROMPT_RE
+
+def read_until_prompt(shell, prompt_re=PROMPT_RE, timeout=10, marker=None, sink=None):
+    """Read from the shell until the device prompt reappears or the timeout expires.
+
+    When a marker is given, the prompt only counts once the marker has been seen.
+    When a sink is given, output is written to it as it arrives and only the
+    last STREAM_TAIL_BYTES are returned.
+    """
+    buf = bytearray()
+    seen_marker = marker is None
+    deadline = time.monotonic() + timeout
+    while True:
+        # Block until data arrives or the deadline passes, no polling slices
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([shell], [], [], remaining)
+        if not readable:
             break
+        data = shell.recv(65536)
+        if not data:
+            break
+        start = len(buf)
+        buf += data
+        if sink is not None:
+            sink.write(data)
+        if not seen_marker:
+            seen_marker = buf.find(marker, max(0, start - len(marker))) != -1
+        if seen_marker and prompt_re.search(buf[-128:]):
+            break
+        if sink is not None and len(buf) > STREAM_TAIL_BYTES:
+            del buf[:-STREAM_TAIL_BYTES]
+    return bytes(buf)
+
+def drain(shell):
+    """Discard whatever the shell already has buffered."""
+    while shell.recv_ready():
+        shell.recv(65536)
+
+class _MarkerSplitter:
+    """Writable that splits streamed batch output on its marker lines
+
+    Output is handled a complete line at a time. Lines before marker i belong to
+    script line i and are passed to emit(i, data) without waiting for the marker,
+    so memory stays at one partial line plus a few held rejection lines.
+    """
+
+    def __init__(self, token, emit):
+        self.marker = b'===END_' + token.encode() + b'_'
+        self.emit = emit
+        self.index = 0
+        self.partial = b''
+        self.held = []
+        self.state = None
+
+    def write(self, data):
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        out = []
+        for line in lines:
+            self._line(line + b'\n', out)
+        self._flush(out)
+        return len(data)
+
+    def close(self):
+        """Hand over what is left once the read is over."""
+        out = list(self.held)
+        if self.partial:
+            out.append(self.partial)
+        self.held, self.partial = [], b''
+        self._flush(out)
+
+    def _line(self, line, out):
+        text = line.rstrip(b'\r\n')
+        if self.marker in line:
+            out.extend(self.held)
+            self._flush(out)
+            self.index += 1
+            self.held, self.state = [], 'marker'
+            return
+        # A rejected comment shows up as a caret line, then an error line and maybe a blank one
+        if self.state == 'marker' and _RX_CARET_LINE.fullmatch(text):
+            self.held, self.state = [line], 'caret'
+            return
+        if self.state == 'caret' and MARKER_REJECTION.search(text):
+            self.held, self.state = [], 'error'
+            return
+        if self.state == 'error' and not text:
+            self.state = None
+            return
+        out.extend(self.held)
+        out.append(line)
+        self.held, self.state = [], None
+
+    def _flush(self, out):
+        if out:
+            self.emit(self.index, b''.join(out))
+            out.clear()
+
+def run_batch(shell, commands, device_type, timeout=60, prompt_re=PROMPT_RE, sink=None, skip=0):
+    """Send all commands in a single write and return the raw output of each one.
+
+    Every command is followed by a comment line carrying a unique marker; the
+    read finishes once the last marker has been echoed and the prompt is back.
+    CLIs that reject the comment only add a caret and an error after each marker,
+    which are stripped along with the marker line. Output of the first skip
+    commands is discarded. When a sink is given, output is written to it as it
+    arrives and nothing is returned.
+    """
+    vendor = device_type.split('-', 1)[0]
+    comment = _COMMENT.get(vendor, _COMMENT['default'])
+    token = uuid.uuid4().hex
+    marker = f"===END_{token}_{{i}}==="
+    # Late output from an earlier read would otherwise land in the first segment
+    drain(shell)
+    payload = ''.join(f"{command}\n{comment} {marker.format(i=i)}\n" for i, command in enumerate(commands))
+    shell.send(payload)
+
+    segments = [[] for _ in commands]
+    sizes = [0] * len(commands)
+
+    def emit(index, data):
+        # Anything after the last marker is the returning prompt
+        if skip <= index < len(commands):
+            sizes[index] += len(data)
+            if sink is None:
+                segments[index].append(data)
+            else:
+                sink.write(data)
+
+    splitter = _MarkerSplitter(token, emit)
+    last_marker = marker.format(i=len(commands) - 1).encode()
+    read_until_prompt(shell, prompt_re, timeout=timeout, marker=last_marker, sink=splitter)
+    splitter.close()
+
+    for command, size in zip(commands[skip:], sizes[skip:]):
+        logging.debug("%s: %d bytes of output", command, size)
+    if sink is not None:
+        return []
+    return [b''.join(parts) for parts in segments[skip:]]
+
+def exec_read(transport, command, timeout=30, sink=None):
+    """Run a read-only command on its own exec channel and return its raw output.
+
+    The channel closes at end of output, so no prompt scraping or paging is involved.
+    When a sink is given, output is streamed into it and nothing is returned.
+    """
+    header = command.encode() + b'\n'
+    chan = transport.open_session()
+    try:
+        chan.settimeout(timeout)
+        chan.set_combine_stderr(True)
+        chan.exec_command(command)
+        if sink is None:
+            output = header + chan.makefile('rb').read()
+        else:
+            sink.write(header)
+            for data in iter(lambda: chan.recv(65536), b''):
+                sink.write(data)
+            output = b''
+        chan.recv_exit_status()
+    finally:
+        chan.close()
     return output
 
-def execute_commands(shell, commands, device_type):
-    """Execute commands based on device type with improved handling."""
-    shell.settimeout(2)
-    output_data = ''
+def exec_parallel(transport, commands, max_channels=MAX_CHANNELS_PER_HOST, sink=None):
+    """Run read-only commands concurrently on separate channels of one transport."""
+    workers = min(len(commands), max_channels)
+    if workers <= 1:
+        return [exec_read(transport, cmd, sink=sink) for cmd in commands]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if sink is None:
+            return list(executor.map(lambda cmd: exec_read(transport, cmd), commands))
+        # Each channel streams into its own spool, which moves to disk past SPOOL_MAX_BYTES,
+        # and the spools are copied into the sink in command order
+        def spool_read(command, spool):
+            exec_read(transport, command, sink=spool)
+            return spool
+
+        spools = [tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) for _ in commands]
+        try:
+            for spool in executor.map(spool_read, commands, spools):
+                spool.seek(0)
+                shutil.copyfileobj(spool, sink)
+                spool.close()
+        finally:
+            for spool in spools:
+                spool.close()
+        return []
+
+def execute_commands(shell, commands, device_type, sink=None, prompt_re=PROMPT_RE):
+    """Execute commands based on device type with improved handling.
+
+    Returns the raw output bytes. When a sink (binary file) is given, output is
+    streamed into it instead of being collected, and b'' is returned.
+    """
+    import paramiko
+
+    lowered = [cmd.strip().lower() for cmd in commands]
+    is_config = any(cmd.split(None, 1)[0] in CONFIG_KEYWORDS for cmd in lowered if cmd)
+    vendor = device_type.split('-', 1)[0]
     
-    # Set pagination off based on device type
-    pagination_cmd = DeviceCommands.get_pagination_command(device_type)
-    shell.send(pagination_cmd + '\n')
-    time.sleep(1)
-    shell.recv(1024)  # Clear buffer
+    # Read-only sets run over exec channels and skip the interactive shell entirely
+    if not is_config:
+        start = sink.tell() if sink is not None else None
+        try:
+            transport = shell.get_transport()
+            if vendor in PARALLEL_EXEC_VENDORS:
+                outputs = exec_parallel(transport, commands, sink=sink)
+            else:
+                outputs = [exec_read(transport, cmd, sink=sink) for cmd in commands]
+            return b''.join(outputs)
+        except paramiko.SSHException as e:
+            logging.warning("Exec channel unavailable (%s), falling back to the interactive shell", e)
+            if sink is not None:
+                # The shell reruns the whole set, drop whatever the exec channels already wrote
+                sink.seek(start)
+                sink.truncate()
     
-    # Enter configuration mode if needed
-    if any(cmd.strip().lower().startswith(('set', 'conf')) for cmd in commands):
-        config_cmd = DeviceCommands.get_config_mode_command(device_type)
-        shell.send(config_cmd + '\n')
-        time.sleep(1)
-        shell.recv(1024)  # Clear buffer
+    if not commands:
+        return b''
     
-    # Execute each command
-    for command in commands:
-        shell.send(command + '\n')
-        time.sleep(1)
-        output_data += get_command_output(shell)
+    # Pagination off, config-mode entry, the commands and the commit all go out in one write
+    script = []
+    if vendor == 'juniper' and not is_config:
+        # Juniper can disable paging per command, saving the pagination line
+        commands = [cmd if '|' in cmd or not low.startswith('show') else cmd + ' | no-more'
+                    for cmd, low in zip(commands, lowered)]
+    else:
+        script.append(_PAGINATION.get(vendor, _PAGINATION['default']))
+    if is_config:
+        script.append(_CONFIG_MODE.get(vendor, _CONFIG_MODE['default']))
+    skip = len(script)
+    script.extend(commands)
+    if is_config:
+        script.append(_COMMIT.get(vendor, _COMMIT['default']))
     
-    # Exit configuration mode if needed
-    if any(cmd.strip().lower().startswith(('set', 'conf')) for cmd in commands):
-        commit_cmd = DeviceCommands.get_commit_command(device_type)
-        shell.send(commit_cmd + '\n')
-        time.sleep(1)
-        output_data += get_command_output(shell)
+    # Segment i belongs to script line i; control lines before the commands are discarded
+    chunks = run_batch(shell, script, device_type, prompt_re=prompt_re, sink=sink, skip=skip)
     
-    return output_data
+    # Join raw bytes once rather than growing a buffer per read
+    return b''.join(chunks)
+
+class HostSession:
+    """Pooled connection plus interactive shell to one host, shared by all its phases
+
+    The prompt and device type are learned once on entry and kept on the session.
+    """
+
+    def __init__(self, pool, hostname, username, password):
+        self.pool = pool
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.client = None
+        self.shell = None
+        self.device_type = None
+        self.prompt_re = PROMPT_RE
 
-def perform_pre_post_checks(hostname_list, username, password, commands, check_type):
-    for hostname in hostname_list:
-        hostname = hostname.strip()
+    def __enter__(self):
+        self.client = self.pool.acquire(self.hostname, self.username, self.password)
         try:
-            logging.info("Connecting to %s for %s checks", hostname, check_type)
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(hostname, username=username, password=password, allow_agent=False, look_for_keys=False)
-            logging.info("Connected to %s", hostname)
-
-            shell = client.invoke_shell()
-            time.sleep(1)
-
-            device_type = identify_device_type(shell)
-            logging.info(f"Detected device type: {device_type}")
-
-            output = execute_commands(shell, commands, device_type)
-            save_option = input(f"Do you want to save the {check_type} check output to a file? (yes/no): ").strip().lower()
-            if save_option in ['yes', 'y']:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                default_filename = f"{hostname}_{check_type}_{timestamp}.txt"
-                file_path = input(f"Enter the file path to save the output [{default_filename}]: ").strip()
-                if not file_path:
-                    file_path = default_filename
-                with open(file_path, 'w') as file:
-                    file.write(f"Output from {hostname} ({device_type}):\n{output}\n")
+            self.shell = self.client.invoke_shell()
+            # Banners often have lines ending in "#", so skip past the banner and learn
+            # the prompt from the reply to a bare newline, once for every later read
+            read_until_prompt(self.shell)
+            drain(self.shell)
+            self.shell.send('\n')
+            self.prompt_re = learn_prompt(read_until_prompt(self.shell))
+            self.device_type = get_device_type(self.hostname, self.shell, self.prompt_re)
+        except Exception:
+            self.client.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shell.close()
+        if exc_type is None:
+            self.pool.release(self.hostname, self.username, self.client)
+        else:
+            # Connection state is unknown after a failure, don't hand it out again
+            self.client.close()
+
+def run_phase(session, commands, label, sink=None):
+    """Run one phase (pre-checks, config push or post-checks) on an open session."""
+    logging.info(f"Performing {label} on {session.hostname}")
+    return execute_commands(session.shell, commands, session.device_type, sink=sink, prompt_re=session.prompt_re)
+
+def run_on_hosts(hostname_list, worker, *args):
+    """Run worker(hostname, *args) for every host concurrently."""
+    hosts = [h.strip() for h in hostname_list if h.strip()]
+    if not hosts:
+        return
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_HOSTS, len(hosts))) as executor:
+        list(executor.map(lambda hostname: worker(hostname, *args), hosts))
+
+def check_host(hostname, pool, username, password, commands, check_type, file_template):
+    """Run pre/post-check commands on a single host."""
+    try:
+        file_path = None
+        if file_template:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = file_template.format(host=hostname, check=check_type, ts=timestamp)
+
+        logging.info("Connecting to %s for %s checks", hostname, check_type)
+        with HostSession(pool, hostname, username, password) as session:
+            device_type = session.device_type
+            logging.info(f"Connected to {hostname} ({device_type})")
+
+            if file_path:
+                # Unbuffered, so every chunk goes straight to os.write
+                with open(file_path, 'wb', buffering=0) as sink:
+                    sink.write(f"Output from {hostname} ({device_type}):\n".encode())
+                    run_phase(session, commands, f"{check_type}s", sink=sink)
+                    sink.write(b"\n")
                 logging.info(f"Output saved to {file_path}")
             else:
-                print(f"Output from {hostname} ({device_type}):\n{output}")
+                output = run_phase(session, commands, f"{check_type}s").decode('utf-8', errors='ignore')
+                write_output(f"Output from {hostname} ({device_type}):\n{output}\n")
+    except Exception as e:
+        logging.error("An error occurred with %s: %s", hostname, str(e))
 
-            shell.close()
-            client.close()
-            logging.info("Disconnected from %s", hostname)
-        except Exception as e:
-            logging.error("An error occurred with %s: %s", hostname, str(e))
+def perform_pre_post_checks(pool, hostname_list, username, password, commands, check_type):
+    # Ask once for every host, before any work starts, so hosts never wait on the keyboard
+    file_template = None
+    save_option = read_line(f"Do you want to save the {check_type} check output to files? (yes/no): ").strip().lower()
+    while save_option in ['yes', 'y']:
+        file_template = read_line(f"Enter the file name template, using {{host}}, {{check}} and {{ts}} [{CHECK_FILE_TEMPLATE}]: ").strip()
+        if not file_template:
+            file_template = CHECK_FILE_TEMPLATE
+        try:
+            fields = {name for _, name, _, _ in string.Formatter().parse(file_template) if name is not None}
+        except ValueError as e:
+            logging.error("Invalid file name template: %s", e)
+            continue
+        if not fields <= {'host', 'check', 'ts'}:
+            logging.error("Unknown fields in file name template: %s", ', '.join(sorted(fields - {'host', 'check', 'ts'})))
+            continue
+        if 'host' not in fields:
+            # Hosts run in parallel, without {host} they would all write the same file
+            root, ext = os.path.splitext(file_template)
+            file_template = f"{root}_{{host}}{ext}"
+        break
+    run_on_hosts(hostname_list, check_host, pool, username, password, commands, check_type, file_template)
+
+def _unified_range(start, stop):
+    """Format a hunk range the way difflib.unified_diff does."""
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start + 1 if length else start},{length}"
+
+def unified_diff_lines(matcher, fromfile, tofile, n=3):
+    """Unified diff lines built from an existing SequenceMatcher's opcodes."""
+    a, b = matcher.a, matcher.b
+    for index, group in enumerate(matcher.get_grouped_opcodes(n)):
+        if index == 0:
+            yield f"--- {fromfile}"
+            yield f"+++ {tofile}"
+        first, last = group[0], group[-1]
+        yield f"@@ -{_unified_range(first[1], last[2])} +{_unified_range(first[3], last[4])} @@"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                yield from (' ' + line for line in a[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                yield from ('-' + line for line in a[i1:i2])
+            if tag in ('replace', 'insert'):
+                yield from ('+' + line for line in b[j1:j2])
 
 def compare_outputs(pre_output, post_output, hostname):
-    """Compare pre and post check outputs and generate detailed diff."""
+    """Compare raw pre and post check outputs and generate detailed diff."""
+    # Only needed once checks have run, keep it off the startup path
+    import difflib
+
     def clean_output(output):
         # Remove timestamp variations and other volatile data
-        lines = output.splitlines()
+        lines = output.decode('utf-8', errors='ignore').splitlines()
         cleaned = []
         for line in lines:
             # Skip empty lines and lines with just whitespace
             if not line.strip():
                 continue
             # Remove timestamp patterns
-            line = re.sub(r'\d{2}:\d{2}:\d{2}\.\d+', 'XX:XX:XX.XXX', line)
-            line = re.sub(r'\d{2}:\d{2}:\d{2}', 'XX:XX:XX', line)
-            cleaned.append(line)
+            cleaned.append(_RX_TIMESTAMP.sub('XX:XX:XX', line))
         return cleaned
 
     pre_lines = clean_output(pre_output)
     post_lines = clean_output(post_output)
     
-    # Generate diff
-    differ = difflib.Differ()
-    diff = list(differ.compare(pre_lines, post_lines))
+    # One matcher drives both the change buckets and the unified diff below;
+    # autojunk's popularity heuristic only hurts on repetitive config output
+    matcher = difflib.SequenceMatcher(a=pre_lines, b=post_lines, autojunk=False)
     
     # Process and categorize differences
     changes = {
@@ -274,121 +789,139 @@ def compare_outputs(pre_output, post_output, hostname):
         'changed': []
     }
     
-    for line in diff:
-        if line.startswith('+ '):
-            changes['added'].append(line[2:])
-        elif line.startswith('- '):
-            changes['removed'].append(line[2:])
-        elif line.startswith('? '):
-            continue
-        else:
-            changes['changed'].append(line[2:])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'insert':
+            changes['added'].extend(post_lines[j1:j2])
+        elif tag == 'delete':
+            changes['removed'].extend(pre_lines[i1:i2])
+        elif tag == 'replace':
+            changes['changed'].append((pre_lines[i1:i2], post_lines[j1:j2]))
 
     # Generate the report
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_filename = f"{hostname}_diff_report_{timestamp}.txt"
     
+    # Assemble the whole report and write it in one call
+    parts = [f"Change Report for {hostname}\n", "=" * 80 + "\n\n"]
+    
+    parts.append("Added Configurations:\n")
+    parts.append("-" * 40 + "\n")
+    parts.extend(f"+ {line}\n" for line in changes['added'])
+    parts.append("\n")
+    
+    parts.append("Removed Configurations:\n")
+    parts.append("-" * 40 + "\n")
+    parts.extend(f"- {line}\n" for line in changes['removed'])
+    parts.append("\n")
+    
+    parts.append("Changed Configurations:\n")
+    parts.append("-" * 40 + "\n")
+    for old_lines, new_lines in changes['changed']:
+        parts.extend(f"- {line}\n" for line in old_lines)
+        parts.extend(f"+ {line}\n" for line in new_lines)
+    parts.append("\n")
+    
+    # Generate detailed diff using unified diff format
+    parts.append("Detailed Diff:\n")
+    parts.append("-" * 40 + "\n")
+    parts.append('\n'.join(unified_diff_lines(matcher, 'Pre-Check', 'Post-Check')))
+    
     with open(report_filename, 'w') as f:
-        f.write(f"Change Report for {hostname}\n")
-        f.write("=" * 80 + "\n\n")
+        f.write(''.join(parts))
         
-        f.write("Added Configurations:\n")
-        f.write("-" * 40 + "\n")
-        for line in changes['added']:
-            f.write(f"+ {line}\n")
-        f.write("\n")
+    return report_filename
+
+@dataclass
+class HostResult:
+    """Raw per-phase output of a config push on one host"""
+    device_type: str = ''
+    pre_check: bytes = b''
+    config: bytes = b''
+    post_check: bytes = b''
+    error: Optional[str] = None
+
+def push_host(hostname, pool, username, password, config_commands, pre_commands, post_commands, results):
+    """Run pre-checks, config push and post-checks on a single host."""
+    result = results[hostname] = HostResult()
+    try:
+        # One connection, shell and device detection for all three phases
+        with HostSession(pool, hostname, username, password) as session:
+            result.device_type = session.device_type
+            logging.info(f"Connected to {hostname} ({session.device_type})")
+            result.pre_check = run_phase(session, pre_commands, "pre-checks")
+            result.config = run_phase(session, config_commands, "config push")
+            result.post_check = run_phase(session, post_commands, "post-checks")
         
-        f.write("Removed Configurations:\n")
-        f.write("-" * 40 + "\n")
-        for line in changes['removed']:
-            f.write(f"- {line}\n")
-        f.write("\n")
+        # Compare and generate diff report
+        report_file = compare_outputs(result.pre_check, result.post_check, hostname)
         
-        # Generate detailed diff using unified diff format
-        f.write("Detailed Diff:\n")
-        f.write("-" * 40 + "\n")
-        unified_diff = difflib.unified_diff(pre_lines, post_lines, 
-                                         fromfile='Pre-Check', 
-                                         tofile='Post-Check',
-                                         lineterm='')
-        f.write('\n'.join(unified_diff))
+        logging.info(f"Diff report generated: {report_file}")
+        write_output(f"\nDiff report for {hostname} has been saved to: {report_file}\n")
         
-    return report_filename
-
-def config_push(hostname_list, username, password, config_commands, pre_commands, post_commands):
-    results = defaultdict(dict)
-    
-    for hostname in hostname_list:
-        hostname = hostname.strip()
-        try:
-            # Connect and get device type
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(hostname, username=username, password=password, 
-                         allow_agent=False, look_for_keys=False)
-            
-            shell = client.invoke_shell()
-            time.sleep(1)
-            device_type = identify_device_type(shell)
-            logging.info(f"Connected to {hostname} ({device_type})")
-            
-            # Perform pre-checks
-            logging.info(f"Performing pre-checks on {hostname}")
-            results[hostname]['pre_check'] = execute_commands(shell, pre_commands, device_type)
-            
-            # Perform config push
-            logging.info(f"Pushing configuration to {hostname}")
-            results[hostname]['config'] = execute_commands(shell, config_commands, device_type)
-            
-            # Perform post-checks
-            logging.info(f"Performing post-checks on {hostname}")
-            results[hostname]['post_check'] = execute_commands(shell, post_commands, device_type)
-            
-            # Compare and generate diff report
-            report_file = compare_outputs(results[hostname]['pre_check'],
-                                       results[hostname]['post_check'],
-                                       hostname)
-            
-            logging.info(f"Diff report generated: {report_file}")
-            print(f"\nDiff report for {hostname} has been saved to: {report_file}")
-            
-            shell.close()
-            client.close()
-            
-        except Exception as e:
-            logging.error(f"An error occurred with {hostname}: {str(e)}")
-            results[hostname]['error'] = str(e)
+    except Exception as e:
+        logging.error(f"An error occurred with {hostname}: {str(e)}")
+        result.error = str(e)
 
+def config_push(pool, hostname_list, username, password, config_commands, pre_commands, post_commands):
+    results = {}
+    run_on_hosts(hostname_list, push_host, pool, username, password,
+                 config_commands, pre_commands, post_commands, results)
     return results
 
 def main():
-    hostname_list, username, password = get_user_input()
-    option = input("Select an option:\n1. Config Push\n2. Pre-checks\n3. Post-checks\nEnter your choice: ").strip()
-    
-    if option == '1':
-        config_commands, pre_commands, post_commands = get_all_commands()
-        scheduled_time = get_schedule_option()
-
-        if scheduled_time:
-            now = datetime.now(pytz.timezone('US/Eastern'))
-            delay = (scheduled_time - now).total_seconds()
-            scheduler = sched.scheduler(time.time, time.sleep)
-            scheduler.enter(delay, 1, config_push, 
-                          (hostname_list, username, password, config_commands, 
-                           pre_commands, post_commands))
-            logging.info(f"Scheduled config push at {scheduled_time}")
-            scheduler.run()
-        else:
-            config_push(hostname_list, username, password, config_commands, 
-                       pre_commands, post_commands)
-    elif option == '2':
-        commands = get_commands()
-        perform_pre_post_checks(hostname_list, username, password, commands, "pre-check")
-    elif option == '3':
-        commands = get_commands()
-        perform_pre_post_checks(hostname_list, username, password, commands, "post-check")
-    else:
-        logging.error("Invalid option selected. Exiting.")
+    hostname_list, username, password, key_path = get_user_input()
+    pkey = None
+    if key_path:
+        import paramiko
+        try:
+            # The password doubles as the passphrase of an encrypted key
+            pkey = load_private_key(key_path, password or None)
+        except (OSError, ValueError, paramiko.SSHException) as e:
+            logging.error("Could not load SSH key %s: %s", key_path, str(e))
+            return
+    # Shared across menu runs so repeated phases on a host reuse its connection
+    pool = SSHPool(pkey=pkey)
+
+    try:
+        while True:
+            option = read_line("Select an option:\n1. Config Push\n2. Pre-checks\n3. Post-checks\n4. Exit\nEnter your choice: ", default='4').strip()
+            
+            if option == '1':
+                config_commands, pre_commands, post_commands = get_all_commands()
+                try:
+                    scheduled_time = get_schedule_option()
+                except ZoneInfoNotFoundError:
+                    logging.error(f"No time zone data for {EASTERN_TZ}, install the tzdata package to schedule pushes")
+                    continue
+
+                if scheduled_time:
+                    import sched
+                    now = datetime.now(scheduled_time.tzinfo)
+                    delay = (scheduled_time - now).total_seconds()
+                    scheduler = sched.scheduler(time.time, time.sleep)
+                    scheduler.enter(delay, 1, config_push, 
+                                  (pool, hostname_list, username, password, config_commands, 
+                                   pre_commands, post_commands))
+                    logging.info(f"Scheduled config push at {scheduled_time}")
+                    scheduler.run()
+                else:
+                    config_push(pool, hostname_list, username, password, config_commands, 
+                               pre_commands, post_commands)
+            elif option == '2':
+                commands = get_commands()
+                perform_pre_post_checks(pool, hostname_list, username, password, commands, "pre-check")
+            elif option == '3':
+                commands = get_commands()
+                perform_pre_post_checks(pool, hostname_list, username, password, commands, "post-check")
+            elif option == '4':
+                break
+            else:
+                logging.error("Invalid option selected. Exiting.")
+                break
+    finally:
+        sys.stdout.flush()
+        pool.close_all()
+        logging.info("Disconnected from all hosts")
 
 if __name__ == "__main__":
     main()